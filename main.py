@@ -1,8 +1,19 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, StrictFloat, TypeAdapter
+from typing import Literal, Optional
+from typing_extensions import TypedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+import asyncio
+import functools
+import logging
+import orjson
+import os
 import sys
+import time
+
+logger = logging.getLogger(__name__)
 
 # Optional: MetaTrader5 is Windows-only.
 try:
@@ -11,64 +22,257 @@ try:
 except ImportError:
     MT5_AVAILABLE = False
 
-from mangum import Mangum
+# --- MT5 Constants ---
+# Resolved once at import so the order path doesn't repeat module lookups
+if MT5_AVAILABLE:
+    # Safe constant retrieval to prevent AttributeError
+    _FOK = getattr(mt5, "SYMBOL_FILLING_FOK", 1) # 1 is standard FOK
+    _IOC = getattr(mt5, "SYMBOL_FILLING_IOC", 2) # 2 is standard IOC
+    _BUY = mt5.ORDER_TYPE_BUY
+    _SELL = mt5.ORDER_TYPE_SELL
+    _GTC = mt5.ORDER_TIME_GTC
+    _DEAL = mt5.TRADE_ACTION_DEAL
+    _DONE = mt5.TRADE_RETCODE_DONE
+    # Order side -> (MT5 order type, 0 for ask / 1 for bid)
+    _SIDE_MAP = {"BUY": (_BUY, 0), "SELL": (_SELL, 1)}
+    _ORDER_TEMPLATE = {"action": _DEAL, "magic": 123456, "type_time": _GTC}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One process-wide MT5 poll feeding every /ws client
+    stream_task = asyncio.create_task(stream_positions()) if MT5_AVAILABLE else None
+    yield
+    if stream_task:
+        stream_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await stream_task
+
+# --- CORS ---
+class LocalCORSMiddleware:
+    """Minimal CORS for the local dashboard origins (credentials allowed, any
+    method/header). Requests without an allowed Origin header pass straight through."""
+
+    ALLOWED_ORIGINS = frozenset({b"http://localhost:3000", b"http://127.0.0.1:3000"})
+    ALLOW_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        origin = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if origin not in self.ALLOWED_ORIGINS:
+            return await self.app(scope, receive, send)
+
+        cors_headers = [
+            (b"access-control-allow-origin", origin),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+
+        # Preflight: answer directly without touching the app
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = cors_headers + [
+                (b"access-control-allow-methods", self.ALLOW_METHODS),
+                (b"access-control-max-age", b"600"),
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", b"2"),
+            ]
+            if request_headers:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": b"OK"})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + cors_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(LocalCORSMiddleware)
+
+# --- MT5 Thread Pool ---
+# The MT5 binding is synchronous, so every call is pushed onto a worker thread
+# to keep the event loop free while the terminal answers.
+_MT5_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="mt5")
+# The binding is not thread-safe for writes: initialize/order_send run one at a time.
+_MT5_WRITE_LOCK = asyncio.Lock()
+
+async def mt5_call(func, *args, **kwargs):
+    """Run a blocking MT5 read on the thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_MT5_POOL, functools.partial(func, *args, **kwargs))
+
+async def mt5_write(func, *args, **kwargs):
+    """Run a blocking MT5 write on the thread pool, serialized with other writes"""
+    async with _MT5_WRITE_LOCK:
+        return await mt5_call(func, *args, **kwargs)
+
+def with_last_error(func, *args, **kwargs):
+    """Call an MT5 function and, if it fails, read last_error() in the same pool job,
+    before any other call on this thread can replace it. Returns (result, error)"""
+    result = func(*args, **kwargs)
+    return result, (None if result else mt5.last_error())
 
 # --- State Management ---
-LAST_ACC = None
+def _env_credentials():
+    """Credentials from MT5_LOGIN/MT5_PASSWORD/MT5_SERVER, so every worker
+    process can initialize its own terminal handle"""
+    login = os.environ.get("MT5_LOGIN")
+    password = os.environ.get("MT5_PASSWORD")
+    server = os.environ.get("MT5_SERVER")
+    if login and password and server:
+        if login.isdigit():
+            return {"login": int(login), "password": password, "server": server}
+        logger.warning("Ignoring MT5_LOGIN=%r: expected a numeric account number", login)
+    return None
+
+LAST_ACC = _env_credentials()
+
+# Resolved (and selected) symbols: input symbol -> (resolved_at, actual_symbol, order_template)
+_SYMBOL_CACHE: dict[str, tuple[float, str, dict]] = {}
+SYMBOL_CACHE_TTL = 60.0
+# Symbols the terminal reported as unknown under every suffix: input symbol -> missed_at
+_SYMBOL_MISS: dict[str, float] = {}
+SYMBOL_MISS_TTL = 60.0
+# last_error() codes for a failed terminal call rather than an unknown symbol
+MT5_IPC_ERRORS = {-10001, -10002, -10003, -10004, -10005}
+
+# Process-local connection state: while a recent check succeeded, skip
+# terminal_info()/initialize() entirely
+_INIT_STATE = {"ok": False, "last_check": 0.0}
+INIT_CHECK_INTERVAL = 5.0
+
+def record_symbol_miss(symbol):
+    now = time.monotonic()
+    # Symbols come from clients: drop expired entries so the dict can't grow unbounded
+    for name, missed_at in list(_SYMBOL_MISS.items()):
+        if now - missed_at >= SYMBOL_MISS_TTL:
+            del _SYMBOL_MISS[name]
+    _SYMBOL_MISS[symbol] = now
+
+def symbol_missed(symbol):
+    """True if the symbol was recently reported unknown under every suffix"""
+    missed_at = _SYMBOL_MISS.get(symbol)
+    return missed_at is not None and time.monotonic() - missed_at < SYMBOL_MISS_TTL
+
+# Encoded bodies of the polled read endpoints: name -> (cached_at, body)
+_RESPONSE_CACHE: dict[str, tuple[float, bytes]] = {}
+
+class RawJSONResponse(JSONResponse):
+    """JSON response for content that is already encoded to bytes"""
+    def render(self, content: bytes) -> bytes:
+        return content
+
+def cached_response(name, ttl):
+    """Serve a read endpoint from _RESPONSE_CACHE for ttl seconds, storing the encoded JSON"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper():
+            cached = _RESPONSE_CACHE.get(name)
+            if cached and time.monotonic() - cached[0] < ttl:
+                return RawJSONResponse(cached[1])
+            result = await func()
+            body = result.body if isinstance(result, JSONResponse) else orjson.dumps(result)
+            _RESPONSE_CACHE[name] = (time.monotonic(), body)
+            return RawJSONResponse(body)
+        return wrapper
+    return decorator
 
-def ensure_mt5():
+def invalidate_trade_views():
+    """Drop cached /positions and /account responses so post-trade views are fresh"""
+    _RESPONSE_CACHE.pop("positions", None)
+    _RESPONSE_CACHE.pop("account", None)
+
+def reset_connection_state():
+    """Forget everything tied to the previous connection: symbol names and filling
+    modes differ between brokers, cached responses between accounts"""
+    _SYMBOL_CACHE.clear()
+    _SYMBOL_MISS.clear()
+    _RESPONSE_CACHE.clear()
+
+def set_connected(ok):
+    """Record the outcome of a connection check or initialize()"""
+    _INIT_STATE["ok"] = bool(ok)
+    _INIT_STATE["last_check"] = time.monotonic()
+
+def _connection_fresh():
+    return _INIT_STATE["ok"] and time.monotonic() - _INIT_STATE["last_check"] < INIT_CHECK_INTERVAL
+
+def check_disconnect(result):
+    """Update connection state from an order_send result"""
+    if result is None or result.retcode == getattr(mt5, "TRADE_RETCODE_CONNECTION", 10031):
+        # The terminal lost its connection: force a real check next time
+        set_connected(False)
+    elif result.retcode == _DONE:
+        _INIT_STATE["last_check"] = time.monotonic()
+
+async def ensure_mt5():
     """Helper to ensure MT5 is initialized with stored credentials if possible"""
     if not MT5_AVAILABLE:
         return False
     
-    # If already initialized and terminal is connected, just return True
-    if mt5.terminal_info() is not None:
+    # Connected recently, no need to ask the terminal again
+    if _connection_fresh():
         return True
-        
-    # If not initialized but we have credentials, try connecting
-    if LAST_ACC:
-        return mt5.initialize(
-            login=LAST_ACC["login"], 
-            password=LAST_ACC["password"], 
-            server=LAST_ACC["server"]
-        )
-    
-    # Fallback to default initialization (checks for active terminal)
-    return mt5.initialize()
+
+    async with _MT5_WRITE_LOCK:
+        # Another request may have re-checked while we waited for the lock
+        if _connection_fresh():
+            return True
+
+        # If already initialized and terminal is connected, just return True
+        ok = await mt5_call(mt5.terminal_info) is not None
+        if not ok:
+            # If not initialized but we have credentials, try connecting,
+            # otherwise fall back to default initialization (checks for active terminal)
+            ok = await mt5_call(mt5.initialize, **(LAST_ACC or {}))
+        set_connected(ok)
+        return _INIT_STATE["ok"]
 
 # --- Data Models ---
 class OrderRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     symbol: str
     type: str # 'BUY' or 'SELL'
-    volume: float
-    sl: Optional[float] = None
-    tp: Optional[float] = None
+    # Strict floats skip string-to-float coercion attempts on the order hot path
+    volume: StrictFloat
+    sl: Optional[StrictFloat] = None
+    tp: Optional[StrictFloat] = None
     comment: Optional[str] = "GainZAlgo Signal"
 
 # --- Routes ---
 
 @app.get("/ping")
-async def ping():
+async def ping() -> dict:
     return {"status": "ok"}
 
 @app.get("/autoconnect")
-async def autoconnect():
+async def autoconnect() -> dict:
     if not MT5_AVAILABLE:
         return {"success": False, "error": "MT5 Library not available on this platform (Linux/Cloud)."}
     
-    if not mt5.initialize():
+    connected = await mt5_write(mt5.initialize)
+    reset_connection_state()
+    set_connected(connected)
+    if not connected:
         return {"success": False, "error": "MT5 Not initialized"}
-    acc = mt5.account_info()
+    acc = await mt5_call(mt5.account_info)
     if acc:
         return {"success": True, "login": acc.login, "balance": acc.balance, "currency": acc.currency}
     return {"success": False}
@@ -79,7 +283,7 @@ class ConnectRequest(BaseModel):
     server: str
 
 @app.post("/connect")
-async def connect(req: ConnectRequest):
+async def connect(req: ConnectRequest) -> dict:
     global LAST_ACC
     if not MT5_AVAILABLE:
         return {"success": False, "error": "MT5 Library not available"}
@@ -91,17 +295,21 @@ async def connect(req: ConnectRequest):
         "server": req.server
     }
     
-    if not mt5.initialize(login=req.login, password=req.password, server=req.server):
-        return {"success": False, "error": f"Failed to connect to {req.server}: {mt5.last_error()}"}
+    connected, error = await mt5_write(with_last_error, mt5.initialize, login=req.login, password=req.password, server=req.server)
+    reset_connection_state()
+    set_connected(connected)
+    if not connected:
+        return {"success": False, "error": f"Failed to connect to {req.server}: {error}"}
     
     return {"success": True}
 
 @app.get("/account")
+@cached_response("account", ttl=2)
 async def get_account():
-    if not ensure_mt5():
+    if not await ensure_mt5():
         return {"isConnected": False}
     
-    acc = mt5.account_info()
+    acc = await mt5_call(mt5.account_info)
     if acc:
         return {
             "login": acc.login,
@@ -112,145 +320,261 @@ async def get_account():
         }
     return {"isConnected": False}
 
-@app.post("/order")
-async def place_order(order: OrderRequest):
-    if not ensure_mt5():
-        return {"success": False, "error": "Bridge not initialized and no credentials available."}
+def cached_symbol(symbol):
+    """(actual_symbol, order_template) if the symbol was resolved within SYMBOL_CACHE_TTL, else None"""
+    cached = _SYMBOL_CACHE.get(symbol)
+    if cached and time.monotonic() - cached[0] < SYMBOL_CACHE_TTL:
+        return cached[1], cached[2]
+    return None
 
-    # Map BUY/SELL to MT5 constants
-    order_type = mt5.ORDER_TYPE_BUY if order.type == "BUY" else mt5.ORDER_TYPE_SELL
-    
+def symbol_not_found(symbol):
+    """Error message for a symbol with no match among its variants"""
+    return f"Symbol {symbol} (or variants) not found in MT5"
+
+async def resolve_symbol(symbol):
+    """Find the broker's name for a symbol and make sure it is visible in Market Watch.
+    Returns (actual_symbol, order_template, error)"""
     # Smart Symbol Detection (Handles Exness 'm' suffix and other variants)
-    actual_symbol = order.symbol
-    symbol_info = mt5.symbol_info(actual_symbol)
+    actual_symbol = symbol
+    symbol_info, error = await mt5_call(with_last_error, mt5.symbol_info, actual_symbol)
+    ipc_failed = bool(error) and error[0] in MT5_IPC_ERRORS
     
     if not symbol_info:
         # Try appending 'm' (Exness), '.pro', '.x', etc.
         for suffix in ['m', '.pro', '.m', '.x']:
-            alt_symbol = order.symbol + suffix
-            info = mt5.symbol_info(alt_symbol)
+            alt_symbol = symbol + suffix
+            info, error = await mt5_call(with_last_error, mt5.symbol_info, alt_symbol)
+            ipc_failed = ipc_failed or (bool(error) and error[0] in MT5_IPC_ERRORS)
             if info:
                 actual_symbol = alt_symbol
                 symbol_info = info
                 break
                 
     if not symbol_info:
-        return {"success": False, "error": f"Symbol {order.symbol} (or variants) not found in MT5"}
+        if ipc_failed:
+            # The terminal didn't answer: don't blame the symbol, recheck the connection
+            set_connected(False)
+        else:
+            record_symbol_miss(symbol)
+        return None, None, symbol_not_found(symbol)
     
     # Ensure symbol is visible in Market Watch
     if not symbol_info.visible:
-        if not mt5.symbol_select(actual_symbol, True):
-            return {"success": False, "error": f"Failed to select symbol {actual_symbol}"}
-
-    tick = mt5.symbol_info_tick(actual_symbol)
-    if not tick:
-        return {"success": False, "error": f"Could not get tick for {actual_symbol}"}
-        
-    price = tick.ask if order.type == "BUY" else tick.bid
+        if not await mt5_call(mt5.symbol_select, actual_symbol, True):
+            return None, None, f"Failed to select symbol {actual_symbol}"
 
-    # Determine optimal filling type
-    # Safe constant retrieval to prevent AttributeError
-    filling_fok = getattr(mt5, "SYMBOL_FILLING_FOK", 1) # 1 is standard FOK
-    filling_ioc = getattr(mt5, "SYMBOL_FILLING_IOC", 2) # 2 is standard IOC
+    template = order_template(actual_symbol, symbol_info.filling_mode)
+    _SYMBOL_CACHE[symbol] = (time.monotonic(), actual_symbol, template)
+    return actual_symbol, template, None
 
+def order_template(actual_symbol, filling_mode):
+    """The per-symbol part of an order request, built once and cached with the symbol"""
     # Determine optimal filling type
-    if symbol_info.filling_mode & filling_fok:
+    if filling_mode & _FOK:
         filling_type = mt5.ORDER_FILLING_FOK
-    elif symbol_info.filling_mode & filling_ioc:
+    elif filling_mode & _IOC:
         filling_type = mt5.ORDER_FILLING_IOC
     else:
         # Fallback for many brokers (especially ECN/Exness)
         filling_type = mt5.ORDER_FILLING_RETURN
 
-    request = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": actual_symbol,
-        "volume": order.volume,
-        "type": order_type,
-        "price": price,
-        "sl": float(order.sl) if order.sl else 0.0,
-        "tp": float(order.tp) if order.tp else 0.0,
-        "magic": 123456,
-        "comment": order.comment or "GainZAlgo Signal",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": filling_type,
-    }
+    template = _ORDER_TEMPLATE.copy()
+    template["symbol"] = actual_symbol
+    template["type_filling"] = filling_type
+    return template
 
-    result = mt5.order_send(request)
-    
+async def resolve_symbol_tick(symbol):
+    """resolve_symbol plus a current tick for the resolved symbol.
+    Returns (order_template, tick, error)"""
+    cached = cached_symbol(symbol)
+    if cached:
+        # Known visible symbol: only the tick is needed
+        actual_symbol, template = cached
+        tick = await mt5_call(mt5.symbol_info_tick, actual_symbol)
+    elif symbol_missed(symbol):
+        # Recently probed with no match: don't hit the terminal again
+        return None, None, symbol_not_found(symbol)
+    else:
+        # Cache miss: the symbol lookup and the tick read are independent, run them together
+        (actual_symbol, template, error), tick = await asyncio.gather(
+            resolve_symbol(symbol),
+            mt5_call(mt5.symbol_info_tick, symbol),
+        )
+        if error:
+            return None, None, error
+        # Resolved to a suffix variant, or the symbol was only just selected
+        if actual_symbol != symbol or not tick:
+            tick = await mt5_call(mt5.symbol_info_tick, actual_symbol)
+
+    if not tick:
+        return None, None, f"Could not get tick for {actual_symbol}"
+    return template, tick, None
+
+def build_order_request(order, template, tick):
+    """Build the order_send request for an order from its symbol template and tick"""
+    # Map BUY/SELL to MT5 constants (side is validated by the route)
+    order_type, side_idx = _SIDE_MAP[order.type]
+
+    request = template.copy()
+    request["volume"] = order.volume
+    request["type"] = order_type
+    request["price"] = tick.ask if side_idx == 0 else tick.bid
+    request["sl"] = float(order.sl or 0.0)
+    request["tp"] = float(order.tp or 0.0)
+    request["comment"] = order.comment or "GainZAlgo Signal"
+    return request
+
+def order_response(result, error):
+    """Turn an order_send result (and its last_error) into the API response"""
+    check_disconnect(result)
     if result is None:
-        return {"success": False, "error": f"Internal MT5 Error: order_send returned None. Error: {mt5.last_error()}"}
+        return {"success": False, "error": f"Internal MT5 Error: order_send returned None. Error: {error}"}
         
-    if result.retcode != mt5.TRADE_RETCODE_DONE:
+    if result.retcode != _DONE:
         return {
             "success": False, 
-            "error": f"Trade failed (Code {result.retcode}): {result.comment if hasattr(result, 'comment') else 'Unknown error'}",
+            "error": f"Trade failed (Code {result.retcode}): {result.comment}",
             "retcode": result.retcode
         }
     
-    return {"success": True, "ticket": result.order}
+    return {"success": True, "ticket": result.order, "retcode": result.retcode}
+
+def send_orders(requests):
+    """Send a list of order requests back to back (runs on the MT5 thread pool).
+    Returns a (result, error) pair per request"""
+    return [with_last_error(mt5.order_send, request) for request in requests]
+
+@app.post("/order")
+async def place_order(order: OrderRequest) -> dict:
+    if not await ensure_mt5():
+        return {"success": False, "error": "Bridge not initialized and no credentials available."}
+
+    if order.type not in _SIDE_MAP:
+        raise HTTPException(status_code=400, detail=f"Invalid order type {order.type!r}, expected 'BUY' or 'SELL'")
+
+    template, tick, error = await resolve_symbol_tick(order.symbol)
+    if error:
+        return {"success": False, "error": error}
+
+    request = build_order_request(order, template, tick)
+    result, error = await mt5_write(with_last_error, mt5.order_send, request)
+    invalidate_trade_views()
+    return order_response(result, error)
+
+class BatchOrderRequest(BaseModel):
+    orders: list[OrderRequest]
+
+@app.post("/batch_order")
+async def place_batch_order(batch: BatchOrderRequest) -> dict:
+    if not await ensure_mt5():
+        return {"success": False, "error": "Bridge not initialized and no credentials available."}
+
+    for index, order in enumerate(batch.orders):
+        if order.type not in _SIDE_MAP:
+            raise HTTPException(status_code=400, detail=f"Invalid order type {order.type!r} at index {index}, expected 'BUY' or 'SELL'")
+
+    # Resolve each distinct symbol (and its tick) once for the whole batch, concurrently
+    distinct = list(dict.fromkeys(order.symbol for order in batch.orders))
+    symbols = dict(zip(distinct, await asyncio.gather(*(resolve_symbol_tick(s) for s in distinct))))
+
+    # Build every request up front so the orders reach the broker back to back
+    results = [None] * len(batch.orders)
+    pending = []
+    for index, order in enumerate(batch.orders):
+        template, tick, error = symbols[order.symbol]
+        if error:
+            results[index] = {"index": index, "success": False, "error": error}
+        else:
+            pending.append((index, build_order_request(order, template, tick)))
+
+    if pending:
+        # One trip through the write lock for all orders
+        sent = await mt5_write(send_orders, [request for _, request in pending])
+        invalidate_trade_views()
+        for (index, _), (result, error) in zip(pending, sent):
+            results[index] = {"index": index, **order_response(result, error)}
+
+    return {"success": all(r["success"] for r in results), "results": results}
 
 class CloseRequest(BaseModel):
     ticket: int
 
 @app.post("/close")
-async def close_position(req: CloseRequest):
-    if not ensure_mt5():
+async def close_position(req: CloseRequest) -> dict:
+    if not await ensure_mt5():
         return {"success": False, "error": "Bridge not initialized"}
     
-    positions = mt5.positions_get(ticket=req.ticket)
+    positions = await mt5_call(mt5.positions_get, ticket=req.ticket)
     if not positions:
         return {"success": False, "error": "Position not found"}
     
     p = positions[0]
-    order_type = mt5.ORDER_TYPE_SELL if p.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
-    tick = mt5.symbol_info_tick(p.symbol)
-    price = tick.bid if order_type == mt5.ORDER_TYPE_SELL else tick.ask
+    order_type = _SELL if p.type == _BUY else _BUY
+    tick = await mt5_call(mt5.symbol_info_tick, p.symbol)
+    price = tick.bid if order_type == _SELL else tick.ask
     
-    request = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": p.symbol,
-        "volume": p.volume,
-        "type": order_type,
-        "position": p.ticket,
-        "price": price,
-        "magic": 123456,
-        "comment": "Close Position",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
-    }
+    request = _ORDER_TEMPLATE.copy()
+    request.update(
+        symbol=p.symbol,
+        volume=p.volume,
+        type=order_type,
+        position=p.ticket,
+        price=price,
+        comment="Close Position",
+        type_filling=mt5.ORDER_FILLING_IOC,
+    )
     
-    result = mt5.order_send(request)
-    if result.retcode != mt5.TRADE_RETCODE_DONE:
+    result, error = await mt5_write(with_last_error, mt5.order_send, request)
+    invalidate_trade_views()
+    check_disconnect(result)
+    if result is None:
+        return {"success": False, "error": f"Internal MT5 Error: order_send returned None. Error: {error}"}
+    if result.retcode != _DONE:
         return {"success": False, "error": f"Close failed: {result.comment}"}
     return {"success": True}
 
+# --- Response Projections ---
+def position_row(p):
+    return {
+        "ticket": p.ticket,
+        "symbol": p.symbol,
+        "volume": p.volume,
+        "type": "BUY" if p.type == 0 else "SELL",
+        "profit": p.profit,
+        "price_open": p.price_open
+    }
+
+class Position(TypedDict):
+    ticket: int
+    symbol: str
+    volume: float
+    type: Literal["BUY", "SELL"]
+    profit: float
+    price_open: float
+
+# Encodes position rows straight to JSON bytes in pydantic-core
+_POS_ADAPTER = TypeAdapter(list[Position])
+
 @app.get("/positions")
+@cached_response("positions", ttl=1)
 async def get_positions():
-    if not ensure_mt5():
+    if not await ensure_mt5():
         return []
         
-    positions = mt5.positions_get()
+    positions = await mt5_call(mt5.positions_get)
     if positions is None:
         return []
     
-    return [
-        {
-            "ticket": p.ticket,
-            "symbol": p.symbol,
-            "volume": p.volume,
-            "type": "BUY" if p.type == 0 else "SELL",
-            "profit": p.profit,
-            "price_open": p.price_open
-        } for p in positions
-    ]
+    rows = [position_row(p) for p in positions]
+    return RawJSONResponse(_POS_ADAPTER.dump_json(rows))
 
 @app.get("/history")
+@cached_response("history", ttl=5)
 async def get_history():
-    if not ensure_mt5():
+    if not await ensure_mt5():
         return []
     
-    deals = mt5.history_deals_get(group="*")
+    deals = await mt5_call(mt5.history_deals_get, group="*")
     if deals is None:
         return []
     
@@ -266,14 +590,112 @@ async def get_history():
         } for d in deals
     ]
 
+# --- Position Stream ---
+_WS_CLIENTS: set[WebSocket] = set()
+STREAM_INTERVAL = 0.5
+# Rows last pushed to /ws clients by ticket; None while nobody is listening
+_STREAM_STATE: dict[str, Optional[dict]] = {"previous": None}
+
+async def broadcast(message):
+    clients = list(_WS_CLIENTS)
+    results = await asyncio.gather(*(ws.send_json(message) for ws in clients), return_exceptions=True)
+    for ws, result in zip(clients, results):
+        if isinstance(result, Exception):
+            _WS_CLIENTS.discard(ws)
+
+async def stream_positions():
+    """Poll positions once per interval for the whole process and push changed/closed tickets to /ws clients"""
+    while True:
+        await asyncio.sleep(STREAM_INTERVAL)
+        if not _WS_CLIENTS:
+            # Nobody listening: stop polling until someone connects
+            _STREAM_STATE["previous"] = None
+            continue
+        try:
+            if not await ensure_mt5():
+                continue
+
+            positions = await mt5_call(mt5.positions_get)
+            if positions is None:
+                continue
+
+            snapshot = {p.ticket: position_row(p) for p in positions}
+            previous = _STREAM_STATE["previous"] or {}
+            changed = [row for ticket, row in snapshot.items() if previous.get(ticket) != row]
+            closed = [ticket for ticket in previous if ticket not in snapshot]
+            _STREAM_STATE["previous"] = snapshot
+            if changed or closed:
+                await broadcast({"type": "positions", "changed": changed, "closed": closed})
+        except Exception:
+            # Keep streaming: one failed poll must not end the task for every client
+            logger.exception("Position stream poll failed")
+
+@app.websocket("/ws")
+async def positions_stream(websocket: WebSocket):
+    # Browsers don't apply CORS to WebSockets, so check the page origin here.
+    # Clients without an Origin header (scripts, local tools) are not web pages.
+    origin = websocket.headers.get("origin")
+    if origin is not None and origin.encode() not in LocalCORSMiddleware.ALLOWED_ORIGINS:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+
+    # Start the client from a full snapshot, deltas follow from the stream task
+    positions = None
+    if await ensure_mt5():
+        positions = await mt5_call(mt5.positions_get)
+    snapshot = {p.ticket: position_row(p) for p in positions or ()}
+    await websocket.send_json({"type": "snapshot", "positions": list(snapshot.values())})
+
+    # First listener: diff the next poll against what this client already has.
+    # With clients already connected the stream's own baseline must stay, or
+    # they would miss changes picked up by this snapshot.
+    if positions is not None and _STREAM_STATE["previous"] is None:
+        _STREAM_STATE["previous"] = snapshot
+
+    _WS_CLIENTS.add(websocket)
+    try:
+        # Keep the socket open until the client disconnects; incoming frames
+        # (text or binary) are ignored
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        _WS_CLIENTS.discard(websocket)
+
 @app.get("/")
-async def root():
+async def root() -> dict:
     return {"message": "API Working"}
 
-# Handler for Netlify
-handler = Mangum(app)
+# Handler for Netlify, only built when actually running on Lambda/Netlify
+if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") or os.environ.get("NETLIFY"):
+    from mangum import Mangum
+    handler = Mangum(app, lifespan="off")
 
 if __name__ == "__main__":
     import uvicorn
-    print("🚀 FastAPI MT5 Bridge starting on http://localhost:8000")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Single worker by default: credentials from /connect, the response/symbol
+    # caches and the /ws poller are all process-local, so with more workers a
+    # request can land on a worker that never saw the connect or the trade.
+    # Only raise WEB_CONCURRENCY when credentials come from MT5_LOGIN/MT5_PASSWORD/
+    # MT5_SERVER and a few seconds of stale reads across workers are acceptable.
+    workers_env = os.environ.get("WEB_CONCURRENCY", "1")
+    if workers_env.isdigit() and int(workers_env) > 0:
+        workers = int(workers_env)
+    else:
+        logger.warning("Ignoring WEB_CONCURRENCY=%r: expected a positive integer", workers_env)
+        workers = 1
+    print(f"🚀 FastAPI MT5 Bridge starting on http://localhost:8000 ({workers} workers)")
+    uvicorn.run(
+        # Workers need an import string; a single worker reuses this module's app
+        # instead of importing main a second time
+        app if workers == 1 else "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto", # uvloop when installed (it does not support Windows)
+        http="httptools",
+        workers=workers,
+        backlog=2048,
+        timeout_keep_alive=30,
+    )